@@ -1,59 +1,129 @@
-from datetime import datetime, timedelta
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from backend.config import settings
 from backend.database import Alert
 
+# Thresholds are read once, settings attribute access is slow in the hot path
+_T_MIN, _T_MAX = settings.TEMPERATURE_MIN, settings.TEMPERATURE_MAX
+_H_MIN, _H_MAX = settings.HUMIDITY_MIN, settings.HUMIDITY_MAX
+
+# sensor_type -> (min, max, unit, label), add more sensors here
+_RULES = {
+    "temperature": (_T_MIN, _T_MAX, "°C", "temperature"),
+    "humidity": (_H_MIN, _H_MAX, "%", "humidity"),
+}
+
+# Alerts are deduplicated per sensor and hour by a unique index on
+# (sensor_id, hour_bucket), the cache below only saves database round-trips
+HOUR_BUCKET_FORMAT = "%Y-%m-%d %H"
+LAST_ALERT_CACHE_SIZE = 10000
+
+# sensor_id -> hour bucket of the last alert, most recently used last
+_last_alert = OrderedDict()
+_LOCK = threading.Lock()
+
+def _in_cooldown(sensor_id, hour_bucket):
+    """Check the in-process cache for an alert on this sensor in the given hour"""
+    with _LOCK:
+        last = _last_alert.get(sensor_id)
+        if last is None:
+            return False
+        _last_alert.move_to_end(sensor_id)
+        return last == hour_bucket
+
+def _remember_alert(sensor_id, hour_bucket):
+    """Record the hour of the last alert for a sensor, evicting the oldest entries"""
+    with _LOCK:
+        _last_alert[sensor_id] = hour_bucket
+        _last_alert.move_to_end(sensor_id)
+        while len(_last_alert) > LAST_ALERT_CACHE_SIZE:
+            _last_alert.popitem(last=False)
+
+def _insert_alerts(db):
+    """INSERT statement for alerts that skips rows already alerted in the same hour"""
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    return insert(Alert).on_conflict_do_nothing(index_elements=["sensor_id", "hour_bucket"])
+
+def _alert_row(sensor_data, threshold, message, now, hour_bucket):
+    return {
+        "sensor_id": sensor_data["sensor_id"],
+        "timestamp": now,
+        "hour_bucket": hour_bucket,
+        "value": sensor_data["value"],
+        "threshold": threshold,
+        "message": message,
+        "was_notified": True
+    }
+
+def _evaluate(sensor_data):
+    """Return (threshold, message) if the reading exceeds its thresholds, else None"""
+    rule = _RULES.get(sensor_data["sensor_type"])
+    if rule is None:
+        return None
+    
+    low, high, unit, label = rule
+    value = sensor_data["value"]
+    if value < low:
+        return low, f"Low {label} alert: {value}{unit} is below threshold of {low}{unit}"
+    if value > high:
+        return high, f"High {label} alert: {value}{unit} is above threshold of {high}{unit}"
+    return None
+
 def check_alert_conditions(db, sensor_data):
     """Check if the sensor reading exceeds defined thresholds"""
-    sensor_type = sensor_data["sensor_type"]
-    value = sensor_data["value"]
+    breach = _evaluate(sensor_data)
+    if breach is not None:
+        create_alert(db, sensor_data, *breach)
+
+def check_alert_conditions_bulk(db, readings):
+    """Check a batch of sensor readings, creating at most one alert per sensor"""
+    now = datetime.utcnow()
+    hour_bucket = now.strftime(HOUR_BUCKET_FORMAT)
     
-    # Define threshold 
-    if sensor_type == "temperature":
-        if value < settings.TEMPERATURE_MIN:
-            create_alert(db, sensor_data, settings.TEMPERATURE_MIN, 
-                        f"Low temperature alert: {value}°C is below threshold of {settings.TEMPERATURE_MIN}°C")
-        elif value > settings.TEMPERATURE_MAX:
-            create_alert(db, sensor_data, settings.TEMPERATURE_MAX,
-                        f"High temperature alert: {value}°C is above threshold of {settings.TEMPERATURE_MAX}°C")
+    # First breach per sensor that the cache doesn't already know about
+    rows = {}
+    for sensor_data in readings:
+        sensor_id = sensor_data["sensor_id"]
+        if sensor_id in rows:
+            continue
+        breach = _evaluate(sensor_data)
+        if breach is not None and not _in_cooldown(sensor_id, hour_bucket):
+            rows[sensor_id] = _alert_row(sensor_data, *breach, now, hour_bucket)
     
-    elif sensor_type == "humidity":
-        if value < settings.HUMIDITY_MIN:
-            create_alert(db, sensor_data, settings.HUMIDITY_MIN,
-                        f"Low humidity alert: {value}% is below threshold of {settings.HUMIDITY_MIN}%")
-        elif value > settings.HUMIDITY_MAX:
-            create_alert(db, sensor_data, settings.HUMIDITY_MAX,
-                        f"High humidity alert: {value}% is above threshold of {settings.HUMIDITY_MAX}%")
+    if not rows:
+        return
     
-    # aadd more sensors later
+    # Sensors already alerted this hour (e.g. before a restart) are skipped by the unique index
+    db.execute(_insert_alerts(db), list(rows.values()))
+    db.commit()
+    for sensor_id in rows:
+        _remember_alert(sensor_id, hour_bucket)
 
 def create_alert(db, sensor_data, threshold, message):
     """Create an alert record and send notifications if needed"""
-    # Check if a similar alert was created recently to avoid alert flooding
-    one_hour_ago = datetime.utcnow() - timedelta(hours=1)
-    recent_alert = db.query(Alert).filter(
-        Alert.sensor_id == sensor_data["sensor_id"],
-        Alert.timestamp > one_hour_ago
-    ).first()
+    sensor_id = sensor_data["sensor_id"]
+    now = datetime.utcnow()
+    hour_bucket = now.strftime(HOUR_BUCKET_FORMAT)
+    
+    # Skip the database entirely if the sensor already alerted this hour
+    if _in_cooldown(sensor_id, hour_bucket):
+        return
+    
+    # Avoid alert flooding: the unique (sensor_id, hour_bucket) index turns a
+    # duplicate into a no-op, also when two writers race for the same alert
+    row = _alert_row(sensor_data, threshold, message, now, hour_bucket)
+    db.execute(_insert_alerts(db), row)
+    db.commit()
+    _remember_alert(sensor_id, hour_bucket)
     
-    if not recent_alert:
-        alert = Alert(
-            sensor_id=sensor_data["sensor_id"],
-            timestamp=datetime.utcnow(),
-            value=sensor_data["value"],
-            threshold=threshold,
-            message=message,
-            was_notified=0
-        )
-        db.add(alert)
-        db.commit()
-        
-        # descomentar para uso real
-        # send_notifications(alert)
-        
-        # Update alert as notified
-        alert.was_notified = 1
-        db.commit()
+    # descomentar para uso real; notify only for new alerts, i.e. when
+    # result.rowcount == 1 for result = db.execute(...) above. If notifications
+    # can fail, insert with was_notified=False and only flag the alert after a successful send
+    # send_notifications(Alert(**row))
 
 def send_notifications(alert):
     """
@@ -21,6 +21,10 @@ class Settings(BaseSettings):
     MQTT_TOPIC: str = os.getenv("MQTT_TOPIC", "sensors/#")
     MQTT_CLIENT_ID: str = os.getenv("MQTT_CLIENT_ID", "iot_dashboard_client")
     
+    # Raw readings older than this are pruned once rolled up into hourly aggregates
+    RAW_RETENTION_DAYS: int = int(os.getenv("RAW_RETENTION_DAYS", "7"))
+    ROLLUP_INTERVAL: int = int(os.getenv("ROLLUP_INTERVAL", "300"))  # seconds
+    
     # Alert thresholds
     TEMPERATURE_MIN: float = float(os.getenv("TEMPERATURE_MIN", "10.0"))
     TEMPERATURE_MAX: float = float(os.getenv("TEMPERATURE_MAX", "30.0"))
@@ -1,44 +1,146 @@
+import queue
+import threading
+import time
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from datetime import datetime
 
 from backend.database import SessionLocal, Sensor, SensorReading
-from backend.alert_system import check_alert_conditions
+from backend.alert_system import check_alert_conditions_bulk
+
+# Readings are queued by the MQTT/REST handlers and written in batches
+INGEST_QUEUE_SIZE = 1000
+BATCH_MAX_SIZE = 100
+BATCH_MAX_WAIT = 0.5  # seconds
+
+ingest_queue = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+_STOP = object()
+_writer_thread = None
+
+# sensor_id -> sensor_type for sensors known to exist in the database,
+# so readings skip the lookup
+_known = {}
+_known_lock = threading.Lock()
+
+def load_known_sensors():
+    """Seed the known sensor cache from the database"""
+    db = SessionLocal()
+    try:
+        sensors = dict(db.query(Sensor.sensor_id, Sensor.sensor_type))
+    finally:
+        db.close()
+    with _known_lock:
+        _known.update(sensors)
+
+def enqueue_sensor_data(sensor_data):
+    """Queue sensor data for the background writer, returns False if the queue is full"""
+    try:
+        ingest_queue.put_nowait(sensor_data)
+        return True
+    except queue.Full:
+        print(f"Warning: ingest queue full, dropping reading from {sensor_data['sensor_id']}")
+        return False
 
 def process_sensor_data(sensor_data):
     """Process incoming sensor data and store it in the database"""
+    process_sensor_data_bulk([sensor_data])
+
+def process_sensor_data_bulk(batch):
+    """Store a batch of sensor data using a single session and commit"""
     db = SessionLocal()
     try:
-        # Check if sensor exists, if not create it
-        sensor = db.query(Sensor).filter(Sensor.sensor_id == sensor_data["sensor_id"]).first()
-        if not sensor:
-            sensor = Sensor(
-                sensor_id=sensor_data["sensor_id"],
-                name=sensor_data["name"],
-                location=sensor_data["location"],
-                sensor_type=sensor_data["sensor_type"]
+        # Check which sensors exist, create the missing ones. Data sent without
+        # sensor metadata (REST) falls back to defaults derived from the id
+        sensor_ids = {sensor_data["sensor_id"] for sensor_data in batch}
+        with _known_lock:
+            sensor_types = {sensor_id: _known[sensor_id] for sensor_id in sensor_ids if sensor_id in _known}
+        unknown = sensor_ids - sensor_types.keys()
+        if unknown:
+            created = dict(
+                db.query(Sensor.sensor_id, Sensor.sensor_type).filter(Sensor.sensor_id.in_(unknown))
             )
-            db.add(sensor)
-            db.commit()
-            db.refresh(sensor)
-        
-        # Create new reading
-        reading = SensorReading(
-            sensor_id=sensor_data["sensor_id"],
-            timestamp=sensor_data.get("timestamp", datetime.utcnow()),
-            value=sensor_data["value"],
-            unit=sensor_data["unit"]
-        )
-        db.add(reading)
+            for sensor_data in batch:
+                sensor_id = sensor_data["sensor_id"]
+                if sensor_id in unknown and sensor_id not in created:
+                    sensor_type = sensor_data.get("sensor_type") or sensor_id.split('_')[0]
+                    db.add(Sensor(
+                        sensor_id=sensor_id,
+                        name=sensor_data.get("name", sensor_id),
+                        location=sensor_data.get("location", "unknown"),
+                        sensor_type=sensor_type
+                    ))
+                    created[sensor_id] = sensor_type
+            # Sensors must be written before the readings referencing them
+            db.flush()
+            sensor_types.update(created)
+
+        # Create new readings, a Core insert skips ORM identity-map bookkeeping
+        # and sends the whole batch in one executemany / multi-row INSERT
+        db.execute(insert(SensorReading), [
+            {
+                "sensor_id": sensor_data["sensor_id"],
+                "timestamp": sensor_data.get("timestamp", datetime.utcnow()),
+                "value": sensor_data["value"],
+                "unit": sensor_data["unit"]
+            }
+            for sensor_data in batch
+        ])
         db.commit()
-        
+        if unknown:
+            with _known_lock:
+                _known.update(created)
+
         # Check for alert conditions
+        for sensor_data in batch:
+            sensor_data.setdefault("sensor_type", sensor_types[sensor_data["sensor_id"]])
         try:
-            check_alert_conditions(db, sensor_data)
+            check_alert_conditions_bulk(db, batch)
         except Exception as e:
+            db.rollback()
             print(f"Error checking alert conditions: {e}")
-        
+
     except Exception as e:
         db.rollback()
         print(f"Error storing sensor data: {e}")
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def _writer_loop():
+    """Drain the ingest queue, writing up to BATCH_MAX_SIZE readings or BATCH_MAX_WAIT seconds at a time"""
+    while True:
+        item = ingest_queue.get()
+        if item is _STOP:
+            return
+        batch = [item]
+        stop = False
+        deadline = time.monotonic() + BATCH_MAX_WAIT
+        while len(batch) < BATCH_MAX_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = ingest_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+
+        process_sensor_data_bulk(batch)
+        if stop:
+            return
+
+def start_writer():
+    """Start the background writer thread if it is not already running"""
+    global _writer_thread
+    if _writer_thread is None or not _writer_thread.is_alive():
+        _writer_thread = threading.Thread(target=_writer_loop, name="sensor-writer", daemon=True)
+        _writer_thread.start()
+    return _writer_thread
+
+def stop_writer(timeout=5):
+    """Flush pending readings and stop the background writer thread"""
+    if _writer_thread is not None and _writer_thread.is_alive():
+        ingest_queue.put(_STOP)
+        _writer_thread.join(timeout)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, create_engine, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, Float, String, DateTime, cast, create_engine, event, extract, false, func, inspect, text, type_coerce, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -27,6 +27,10 @@ class SensorReading(Base):
     unit = Column(String)
     sensor = relationship("Sensor", back_populates="readings")
 
+    __table_args__ = (
+        Index("ix_readings_sensor_ts", sensor_id, timestamp.desc()),
+    )
+
 class Alert(Base):
     __tablename__ = "alerts"
     
@@ -36,12 +40,68 @@ class Alert(Base):
     value = Column(Float)
     threshold = Column(Float)
     message = Column(String)
-    was_notified = Column(Integer, default=0)  # 0: not sent, 1: sent
+    was_notified = Column(Boolean, nullable=False, server_default=false())
+    hour_bucket = Column(String)  # "%Y-%m-%d %H" of timestamp, one alert per sensor and hour
+
+    __table_args__ = (
+        Index("ix_alerts_sensor_ts", sensor_id, timestamp.desc()),
+        # A unique index rather than a constraint, so it can be added to existing tables
+        Index("uq_alert_sensor_hour", sensor_id, hour_bucket, unique=True),
+    )
+
+class SensorReadingHourly(Base):
+    """Hourly aggregates of sensor_readings, kept after raw rows are pruned"""
+    __tablename__ = "sensor_readings_hourly"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    sensor_id = Column(String, ForeignKey("sensors.sensor_id"))
+    hour = Column(DateTime)
+    avg = Column(Float)
+    min = Column(Float)
+    max = Column(Float)
+    count = Column(Integer)
+
+    __table_args__ = (
+        UniqueConstraint("sensor_id", "hour", name="uq_readings_hourly_sensor_hour"),
+    )
 
 # Database connection
-engine = create_engine(settings.DATABASE_URL)
+_is_sqlite = settings.DATABASE_URL.startswith("sqlite")
+
+# The writer thread and the API workers share the pool, so SQLite
+# connections must be usable from threads other than their creator
+engine = create_engine(
+    settings.DATABASE_URL,
+    connect_args={"check_same_thread": False} if _is_sqlite else {},
+    # Rows per multi-row INSERT when the writer inserts a batch of readings
+    insertmanyvalues_page_size=200
+)
+
+if _is_sqlite:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Use WAL so dashboard reads don't block on the ingest writer"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-65536")  # 64 MB
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def time_bucket(column, seconds):
+    """SQL expression truncating a timestamp column to buckets of `seconds`"""
+    if _is_sqlite:
+        epoch = cast(func.strftime("%s", column), Integer)
+        bucket = func.datetime(epoch // seconds * seconds, "unixepoch")
+    else:
+        epoch = func.floor(extract("epoch", column) / seconds) * seconds
+        bucket = func.timezone("UTC", func.to_timestamp(epoch))
+    # Results come back as naive UTC datetimes, like the stored timestamps
+    return type_coerce(bucket, DateTime)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -50,4 +110,30 @@ def get_db():
         db.close()
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so columns and indexes
+    # added later have to be created explicitly on older databases.
+    # New columns on existing tables must be nullable
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                    ))
+        # alerts.was_notified used to be an integer, SQLite stores both the same way
+        if engine.dialect.name == "postgresql":
+            was_notified = next(c for c in inspector.get_columns("alerts") if c["name"] == "was_notified")
+            if not isinstance(was_notified["type"], Boolean):
+                connection.execute(text(
+                    "ALTER TABLE alerts ALTER COLUMN was_notified DROP DEFAULT, "
+                    "ALTER COLUMN was_notified TYPE BOOLEAN USING was_notified <> 0, "
+                    "ALTER COLUMN was_notified SET DEFAULT false, "
+                    "ALTER COLUMN was_notified SET NOT NULL"
+                ))
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
@@ -1,14 +1,18 @@
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 import uvicorn
-from typing import List, Optional
-from datetime import datetime, timedelta
+from typing import List, Optional, Union
+from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel, Field
 
-from backend.database import get_db, init_db, Sensor as DBSensor, SensorReading as DBSensorReading, Alert as DBAlert
+from backend.config import settings
+from backend.database import get_db, init_db, time_bucket, Sensor as DBSensor, SensorReading as DBSensorReading, SensorReadingHourly as DBSensorReadingHourly, Alert as DBAlert
 from backend.mqtt_client import start_mqtt_client
-from backend.data_processor import process_sensor_data
+from backend.data_processor import enqueue_sensor_data, load_known_sensors, start_writer, stop_writer
+from backend.rollup import start_rollup_worker, stop_rollup_worker
 
 # Pydantic models for API
 class SensorBase(BaseModel):
@@ -38,6 +42,13 @@ class SensorReadingResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class SensorReadingBucketResponse(BaseModel):
+    bucket: datetime
+    avg: float
+    min: float
+    max: float
+    count: int
+
 class AlertResponse(BaseModel):
     id: int
     sensor_id: str
@@ -49,9 +60,15 @@ class AlertResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Supported aggregation buckets for readings, in seconds
+READING_BUCKETS = {"1m": 60, "5m": 300, "1h": 3600}
+
 # Initialize FastAPI app
 app = FastAPI(title="IoT Sensor Dashboard API")
 
+# Compress larger responses (e.g. readings) for clients sending Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -65,6 +82,9 @@ app.add_middleware(
 @app.on_event("startup")
 def startup_event():
     init_db()
+    load_known_sensors()
+    start_writer()
+    start_rollup_worker()
     global mqtt_client
     try:
         mqtt_client = start_mqtt_client()
@@ -72,48 +92,118 @@ def startup_event():
         print(f"Warning: Could not start MQTT client: {e}")
         print("The application will continue without MQTT support.")
 
+@app.on_event("shutdown")
+def shutdown_event():
+    stop_writer()
+    stop_rollup_worker()
+
 # API endpoints
 @app.post("/api/sensors/data")
-async def add_sensor_data(data: SensorData, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def add_sensor_data(data: SensorData):
     """Endpoint to receive sensor data via REST API"""
-    sensor = db.query(DBSensor).filter(DBSensor.sensor_id == data.sensor_id).first()
-    
-    # Prepare full sensor data
+    # Sensor metadata is resolved by the background writer, so the request
+    # returns without touching the database
     sensor_data = {
         "sensor_id": data.sensor_id,
-        "name": sensor.name if sensor else data.sensor_id,
-        "location": sensor.location if sensor else "unknown",
-        "sensor_type": sensor.sensor_type if sensor else data.sensor_id.split('_')[0],
         "value": data.value,
         "unit": data.unit,
         "timestamp": datetime.utcnow()
     }
     
-    # Process sensor data in the background
-    background_tasks.add_task(process_sensor_data, sensor_data)
+    # Hand the data to the background writer, which stores it in batches
+    if not enqueue_sensor_data(sensor_data):
+        raise HTTPException(status_code=503, detail="Ingest queue is full, retry later")
     
-    return {"status": "success", "message": "Data received"}
+    return {"status": "queued", "message": "Data received"}
 
 @app.get("/api/sensors", response_model=List[Sensor])
 async def get_sensors(db: Session = Depends(get_db)):
     """Get all registered sensors"""
     return db.query(DBSensor).all()
 
-@app.get("/api/sensors/{sensor_id}/readings", response_model=List[SensorReadingResponse])
+def _raw_hours_start():
+    """First hour whose raw readings are all still retained, older hours are only in the rollup table"""
+    cutoff = datetime.utcnow() - timedelta(days=settings.RAW_RETENTION_DAYS)
+    return cutoff.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+
+def _as_naive_utc(value):
+    """Convert a datetime to naive UTC, the way timestamps are stored"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+@app.get(
+    "/api/sensors/{sensor_id}/readings",
+    response_model=Union[List[SensorReadingResponse], List[SensorReadingBucketResponse]]
+)
 async def get_sensor_readings(
     sensor_id: str, 
     limit: int = 100, 
     start_time: Optional[datetime] = None,
     end_time: Optional[datetime] = None,
+    bucket: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get readings for a specific sensor with optional time filtering"""
-    query = db.query(DBSensorReading).filter(DBSensorReading.sensor_id == sensor_id)
+    """
+    Get readings for a specific sensor with optional time filtering.
+    With `bucket` (1m, 5m or 1h) the readings are aggregated in the database
+    and (bucket, avg, min, max, count) rows are returned instead.
+    """
+    if bucket is not None and bucket not in READING_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid bucket '{bucket}', expected one of: {', '.join(READING_BUCKETS)}"
+        )
+    
+    # Hourly buckets reaching past the raw retention window are split: recent
+    # hours are aggregated live from raw readings, older ones come from the rollup table
+    rollup_before = None
+    if bucket == "1h":
+        rollup_before = _raw_hours_start()
+        if start_time and _as_naive_utc(start_time) >= rollup_before:
+            rollup_before = None
+    
+    if bucket:
+        bucket_column = time_bucket(DBSensorReading.timestamp, READING_BUCKETS[bucket]).label("bucket")
+        query = db.query(
+            bucket_column,
+            func.avg(DBSensorReading.value).label("avg"),
+            func.min(DBSensorReading.value).label("min"),
+            func.max(DBSensorReading.value).label("max"),
+            func.count(DBSensorReading.value).label("count")
+        )
+    else:
+        query = db.query(DBSensorReading)
+    query = query.filter(DBSensorReading.sensor_id == sensor_id)
     
     if start_time:
         query = query.filter(DBSensorReading.timestamp >= start_time)
     if end_time:
         query = query.filter(DBSensorReading.timestamp <= end_time)
+    if rollup_before:
+        query = query.filter(DBSensorReading.timestamp >= rollup_before)
+    
+    if bucket:
+        rows = query.group_by(bucket_column).order_by(bucket_column.desc()).limit(limit).all()
+        results = [row._asdict() for row in rows]
+        if rollup_before and len(results) < limit:
+            query = db.query(
+                DBSensorReadingHourly.hour.label("bucket"),
+                DBSensorReadingHourly.avg,
+                DBSensorReadingHourly.min,
+                DBSensorReadingHourly.max,
+                DBSensorReadingHourly.count
+            ).filter(
+                DBSensorReadingHourly.sensor_id == sensor_id,
+                DBSensorReadingHourly.hour < rollup_before
+            )
+            if start_time:
+                query = query.filter(DBSensorReadingHourly.hour >= start_time)
+            if end_time:
+                query = query.filter(DBSensorReadingHourly.hour <= end_time)
+            rows = query.order_by(DBSensorReadingHourly.hour.desc()).limit(limit - len(results)).all()
+            results.extend(row._asdict() for row in rows)
+        return results
     
     return query.order_by(DBSensorReading.timestamp.desc()).limit(limit).all()
 
@@ -1,12 +1,22 @@
-import json
+import re
 import paho.mqtt.client as mqtt
 from datetime import datetime
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
+
 from backend.config import settings
-from backend.data_processor import process_sensor_data
+from backend.data_processor import enqueue_sensor_data
 
 #not fully implemented
 
+# Sensor topics look like "sensors/<sensor_type>/<location>"
+_TOPIC_RE = re.compile(r"^[^/]+/([^/]+)/([^/]+)")
+
 # Callback when the client receives a CONNACK response from the server
 def on_connect(client, userdata, flags, rc):
     print(f"Connected with result code {rc}")
@@ -15,29 +25,31 @@ def on_connect(client, userdata, flags, rc):
 
 # Callback when a message is received from the server
 def on_message(client, userdata, msg):
+    # Skip topics that don't match the sensor pattern before decoding anything
+    match = _TOPIC_RE.match(msg.topic)
+    if not match:
+        return
+    
     try:
-        payload = json.loads(msg.payload.decode())
+        payload = _loads(msg.payload)
         
         # Extract topic parts (e.g., "sensors/temperature/living_room")
-        topic_parts = msg.topic.split('/')
-        if len(topic_parts) >= 3:
-            sensor_type = topic_parts[1]
-            location = topic_parts[2]
-            
-            # Create sensor data object
-            sensor_data = {
-                "sensor_id": f"{sensor_type}_{location}",
-                "name": f"{sensor_type.capitalize()} Sensor",
-                "location": location.replace('_', ' ').title(),
-                "sensor_type": sensor_type,
-                "value": float(payload.get("value", 0)),
-                "unit": payload.get("unit", ""),
-                "timestamp": datetime.utcnow()
-            }
-            
-            # Process and store the data
-            process_sensor_data(sensor_data)
-            
+        sensor_type, location = match.group(1), match.group(2)
+        
+        # Create sensor data object
+        sensor_data = {
+            "sensor_id": f"{sensor_type}_{location}",
+            "name": f"{sensor_type.capitalize()} Sensor",
+            "location": location.replace('_', ' ').title(),
+            "sensor_type": sensor_type,
+            "value": float(payload.get("value", 0)),
+            "unit": payload.get("unit", ""),
+            "timestamp": datetime.utcnow()
+        }
+        
+        # Queue the data for the background writer
+        enqueue_sensor_data(sensor_data)
+        
     except Exception as e:
         print(f"Error processing MQTT message: {e}")
 
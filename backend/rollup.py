@@ -0,0 +1,72 @@
+"""
+Hourly rollup of sensor readings and pruning of old raw readings
+"""
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert
+
+from backend.config import settings
+from backend.database import SessionLocal, SensorReading, SensorReadingHourly, time_bucket
+
+_stop_event = threading.Event()
+_rollup_thread = None
+
+def rollup_readings(db):
+    """Aggregate new raw readings into hourly rows, then prune raw readings past retention"""
+    # The newest rolled-up hour may have been partial, so it is recomputed
+    last_hour = db.query(func.max(SensorReadingHourly.hour)).scalar()
+
+    hour = time_bucket(SensorReading.timestamp, 3600).label("hour")
+    query = db.query(
+        SensorReading.sensor_id,
+        hour,
+        func.avg(SensorReading.value).label("avg"),
+        func.min(SensorReading.value).label("min"),
+        func.max(SensorReading.value).label("max"),
+        func.count(SensorReading.value).label("count")
+    )
+    if last_hour is not None:
+        query = query.filter(SensorReading.timestamp >= last_hour)
+        db.query(SensorReadingHourly).filter(
+            SensorReadingHourly.hour >= last_hour
+        ).delete(synchronize_session=False)
+
+    rows = [row._asdict() for row in query.group_by(SensorReading.sensor_id, hour)]
+    if rows:
+        db.execute(insert(SensorReadingHourly), rows)
+
+    cutoff = datetime.utcnow() - timedelta(days=settings.RAW_RETENTION_DAYS)
+    db.query(SensorReading).filter(
+        SensorReading.timestamp < cutoff
+    ).delete(synchronize_session=False)
+    db.commit()
+
+def _rollup_loop():
+    """Run the rollup every ROLLUP_INTERVAL seconds until stopped"""
+    while True:
+        db = SessionLocal()
+        try:
+            rollup_readings(db)
+        except Exception as e:
+            db.rollback()
+            print(f"Error rolling up sensor readings: {e}")
+        finally:
+            db.close()
+
+        if _stop_event.wait(settings.ROLLUP_INTERVAL):
+            return
+
+def start_rollup_worker():
+    """Start the background rollup thread if it is not already running"""
+    global _rollup_thread
+    if _rollup_thread is None or not _rollup_thread.is_alive():
+        _stop_event.clear()
+        _rollup_thread = threading.Thread(target=_rollup_loop, name="readings-rollup", daemon=True)
+        _rollup_thread.start()
+    return _rollup_thread
+
+def stop_rollup_worker(timeout=5):
+    """Stop the background rollup thread"""
+    _stop_event.set()
+    if _rollup_thread is not None:
+        _rollup_thread.join(timeout)
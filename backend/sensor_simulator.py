@@ -2,8 +2,10 @@
 Simple sensor simulator to generate test data for the IoT Dashboard
 """
 import requests
+from requests.adapters import HTTPAdapter
 import random
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import json
 
@@ -19,6 +21,10 @@ SENSORS = [
     {"id": "humidity_bedroom", "type": "humidity", "unit": "%", "min": 35, "max": 75}
 ]
 
+# Keep-alive session shared by all requests, one pooled connection per worker
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=8, pool_maxsize=8))
+
 def generate_reading(sensor):
     """Generate a random sensor reading within the defined range"""
     return round(random.uniform(sensor["min"], sensor["max"]), 2)
@@ -32,7 +38,7 @@ def send_data(sensor_id, value, unit):
     }
     
     try:
-        response = requests.post(API_URL, json=data)
+        response = SESSION.post(API_URL, json=data)
         if response.status_code == 200:
             print(f"✅ [{datetime.now().strftime('%H:%M:%S')}] Sent {sensor_id}: {value} {unit}")
             return True
@@ -50,11 +56,12 @@ def main():
     print("Press Ctrl+C to stop")
     print("-------------------")
     
+    executor = ThreadPoolExecutor(max_workers=len(SENSORS))
     try:
         while True:
             # Check if API is available by sending a status request
             try:
-                status_response = requests.get("http://localhost:8000/api/status")
+                status_response = SESSION.get("http://localhost:8000/api/status")
                 if status_response.status_code != 200:
                     print("⚠️ API not responding correctly. Waiting...")
                     time.sleep(5)
@@ -64,11 +71,11 @@ def main():
                 time.sleep(5)
                 continue
             
-            # Generate and send readings for each sensor
-            for sensor in SENSORS:
-                value = generate_reading(sensor)
-                send_data(sensor["id"], value, sensor["unit"])
-                time.sleep(0.5)  # Short delay between sensors
+            # Generate and send readings for all sensors concurrently
+            list(executor.map(
+                lambda sensor: send_data(sensor["id"], generate_reading(sensor), sensor["unit"]),
+                SENSORS
+            ))
             
             # Occasionally send an anomaly
             if random.random() < 0.1:  # 10% chance per cycle
@@ -90,6 +97,8 @@ def main():
     
     except KeyboardInterrupt:
         print("\n✋ Simulator stopped")
+    finally:
+        executor.shutdown(wait=False)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
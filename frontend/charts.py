@@ -2,10 +2,88 @@
 Chart components for the IoT Sensor Dashboard
 This module provides reusable chart components for visualizing sensor data
 """
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
+from functools import lru_cache
+
+
+# Gauge bands per sensor type: breakpoints as fractions of the gauge span
+# (or absolute values, with the ends set to the gauge limits) and the color
+# of each band between them
+_GAUGE_BANDS = {
+    "temperature": (np.array([0.0, 0.3, 0.7, 1.0]), False, ("blue", "green", "red")),  # Cold / Normal / Hot
+    "humidity": (np.array([np.nan, 30.0, 60.0, np.nan]), True, ("red", "green", "blue")),  # Too dry / Comfortable / Too humid
+}
+_DEFAULT_GAUGE_BANDS = (np.array([0.0, 1 / 3, 2 / 3, 1.0]), False, ("blue", "green", "red"))
+
+@lru_cache(maxsize=None)
+def _plotly():
+    """Import plotly on first use instead of at module import, it is slow to load"""
+    import plotly.express as px
+    import plotly.graph_objects as go
+    return px, go
+
+
+def _to_datetime(series):
+    """
+    Convert a timestamp column to datetimes, skipping columns that are already converted
+    
+    Args:
+        series (pd.Series): Datetimes, epoch milliseconds or timestamp strings
+        
+    Returns:
+        pd.Series: Datetime series
+    """
+    import pandas as pd
+    
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    if pd.api.types.is_numeric_dtype(series):
+        return pd.to_datetime(series, unit="ms", utc=True, cache=True)
+    return pd.to_datetime(series, cache=True)
+
+
+# Time series longer than this are downsampled before plotting
+MAX_TIME_SERIES_POINTS = 2000
+
+
+def _lttb(x, y, n_out):
+    """
+    Downsample a series with Largest-Triangle-Three-Buckets
+    
+    Args:
+        x (np.ndarray): Sorted x values as float64
+        y (np.ndarray): y values as float64
+        n_out (int): Number of points to keep
+        
+    Returns:
+        np.ndarray: Indices of the points to keep
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    
+    # First and last points are always kept, the rest is split into buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        
+        # Keep the point forming the largest triangle with the previous pick
+        # and the average of the next bucket
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    
+    return keep
 
 
 def create_time_series_chart(df, value_column="value", time_column="timestamp", 
@@ -24,6 +102,8 @@ def create_time_series_chart(df, value_column="value", time_column="timestamp",
     Returns:
         plotly.graph_objects.Figure: A plotly figure object
     """
+    px, go = _plotly()
+    
     if df.empty:
         # Create an empty figure with a message if no data
         fig = go.Figure()
@@ -39,13 +119,33 @@ def create_time_series_chart(df, value_column="value", time_column="timestamp",
         )
         return fig
     
-    # Create time series chart
-    fig = px.line(
-        df, 
-        x=time_column, 
-        y=value_column,
+    times = _to_datetime(df[time_column])
+    values = df[value_column]
+    if not times.is_monotonic_increasing:
+        order = np.argsort(times.to_numpy(), kind="stable")
+        times, values = times.iloc[order], values.iloc[order]
+    
+    # Downsample long series on the server so the browser only draws what's visible
+    if len(times) > MAX_TIME_SERIES_POINTS:
+        x = times.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        keep = _lttb(
+            (x - x[0]).astype(np.float64),
+            values.to_numpy(dtype=np.float64),
+            MAX_TIME_SERIES_POINTS
+        )
+        times, values = times.iloc[keep], values.iloc[keep]
+    
+    # Create time series chart, WebGL keeps long series responsive
+    fig = go.Figure(go.Scattergl(
+        x=times,
+        y=values,
+        mode="lines",
+        name=y_label if y_label else "Value"
+    ))
+    fig.update_layout(
         title=title,
-        labels={time_column: "Time", value_column: f"{y_label if y_label else 'Value'} ({unit})"}
+        xaxis_title="Time",
+        yaxis_title=f"{y_label if y_label else 'Value'} ({unit})"
     )
     
     # Add range selector and slider
@@ -69,7 +169,7 @@ def create_time_series_chart(df, value_column="value", time_column="timestamp",
     return fig
 
 
-def create_gauge_chart(value, min_value, max_value, title, unit=""):
+def create_gauge_chart(value, min_value, max_value, title, unit="", sensor_type=None):
     """
     Create a gauge chart for displaying current sensor value
     
@@ -79,33 +179,29 @@ def create_gauge_chart(value, min_value, max_value, title, unit=""):
         max_value (float): Maximum value for the gauge
         title (str): Chart title
         unit (str): Unit of measurement
+        sensor_type (str): Sensor type used to pick the threshold bands,
+            guessed from the title if not given
         
     Returns:
         plotly.graph_objects.Figure: A plotly figure object
     """
-    # Define threshold ranges based on sensor type from title
-    if "temperature" in title.lower():
-        # Temperature thresholds
-        ranges = [
-            (min_value, min_value + (max_value - min_value) * 0.3, "blue"),  # Cold
-            (min_value + (max_value - min_value) * 0.3, min_value + (max_value - min_value) * 0.7, "green"),  # Normal
-            (min_value + (max_value - min_value) * 0.7, max_value, "red")  # Hot
-        ]
-    elif "humidity" in title.lower():
-        # Humidity thresholds
-        ranges = [
-            (min_value, 30, "red"),  # Too dry
-            (30, 60, "green"),  # Comfortable
-            (60, max_value, "blue")  # Too humid
-        ]
+    px, go = _plotly()
+    
+    if sensor_type is None:
+        title_lower = title.lower()
+        sensor_type = next((key for key in _GAUGE_BANDS if key in title_lower), None)
+    breakpoints, absolute, colors = _GAUGE_BANDS.get(sensor_type, _DEFAULT_GAUGE_BANDS)
+    
+    # Materialize all breakpoints at once
+    if absolute:
+        breakpoints = breakpoints.copy()
+        breakpoints[0], breakpoints[-1] = min_value, max_value
     else:
-        # Generic ranges split into three equal parts
-        third = (max_value - min_value) / 3
-        ranges = [
-            (min_value, min_value + third, "blue"),
-            (min_value + third, min_value + 2 * third, "green"),
-            (min_value + 2 * third, max_value, "red")
-        ]
+        breakpoints = min_value + (max_value - min_value) * breakpoints
+    ranges = [
+        (low, high, color)
+        for low, high, color in zip(breakpoints[:-1].tolist(), breakpoints[1:].tolist(), colors)
+    ]
     
     # Create the gauge chart
     fig = go.Figure(go.Indicator(
@@ -147,6 +243,8 @@ def create_heatmap(df, sensor_ids, time_column="timestamp", value_column="value"
     Returns:
         plotly.graph_objects.Figure: A plotly figure object
     """
+    px, go = _plotly()
+    
     if df.empty or not sensor_ids:
         # Create empty figure with message
         fig = go.Figure()
@@ -158,22 +256,19 @@ def create_heatmap(df, sensor_ids, time_column="timestamp", value_column="value"
         )
         return fig
     
-    # Resample data to create regular time intervals (hourly)
-    df[time_column] = pd.to_datetime(df[time_column])
-    df.set_index(time_column, inplace=True)
-    
-    # Create a pivot table for the heatmap
+    # Resample each sensor to hourly means, one column per sensor
     sensor_id_column = "sensor_id"  # Adjust if your column name is different
-    pivot_df = df.pivot_table(
-        index=pd.Grouper(freq='H'),  # Group by hour
-        columns=sensor_id_column,
-        values=value_column,
-        aggfunc='mean'  # Use mean for multiple values in same hour
+    selected = df[df[sensor_id_column].isin(sensor_ids)]
+    pivot_df = (
+        selected.assign(**{time_column: _to_datetime(selected[time_column])})
+        .set_index(time_column)
+        .groupby(sensor_id_column)[value_column]
+        .resample("1h")
+        .mean()
+        .unstack(0)
+        .reindex(columns=sensor_ids)  # Keep the requested sensor order
     )
     
-    # Filter for selected sensors only
-    pivot_df = pivot_df[sensor_ids]
-    
     # Create heatmap
     fig = px.imshow(
         pivot_df.T,  # Transpose to have sensors on y-axis
@@ -202,6 +297,8 @@ def create_histogram(df, value_column="value", title=None, bins=20, unit=""):
     Returns:
         plotly.graph_objects.Figure: A plotly figure object
     """
+    px, go = _plotly()
+    
     if df.empty:
         # Create empty figure with message
         fig = go.Figure()
@@ -249,6 +346,9 @@ def create_comparison_chart(df, sensor_groups, time_column="timestamp", value_co
     Returns:
         plotly.graph_objects.Figure: A plotly figure object
     """
+    import pandas as pd
+    px, go = _plotly()
+    
     if df.empty or not sensor_groups:
         # Create empty figure with message
         fig = go.Figure()
@@ -260,26 +360,30 @@ def create_comparison_chart(df, sensor_groups, time_column="timestamp", value_co
         )
         return fig
     
-    # Convert timestamps to datetime
-    df[time_column] = pd.to_datetime(df[time_column])
+    # Map every sensor to its group(s) and resample all groups to hourly means at once
+    membership = pd.DataFrame(
+        [(group_name, sensor) for group_name, sensors in sensor_groups.items() for sensor in sensors],
+        columns=["_group", group_column]
+    )
+    grouped = df[[group_column, time_column, value_column]].merge(membership, on=group_column)
+    grouped[time_column] = _to_datetime(grouped[time_column])
+    hourly_data = grouped.groupby(
+        ["_group", pd.Grouper(key=time_column, freq="1h")]
+    )[value_column].mean()
     
     # Create figure
     fig = go.Figure()
     
     # Add a line for each sensor group
-    for group_name, sensors in sensor_groups.items():
-        # Filter for sensors in this group
-        group_df = df[df[group_column].isin(sensors)]
-        
-        if not group_df.empty:
-            # Resample to hourly data
-            group_df.set_index(time_column, inplace=True)
-            hourly_data = group_df.groupby(pd.Grouper(freq='H'))[value_column].mean().reset_index()
+    available = set(hourly_data.index.get_level_values(0))
+    for group_name in sensor_groups:
+        if group_name in available:
+            group_data = hourly_data.xs(group_name, level=0)
             
             # Add line to chart
             fig.add_trace(go.Scatter(
-                x=hourly_data[time_column],
-                y=hourly_data[value_column],
+                x=group_data.index,
+                y=group_data.values,
                 mode='lines',
                 name=group_name
             ))
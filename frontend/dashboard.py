@@ -1,56 +1,14 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
-import requests
 import io
 import json
 import sys
 import os
-import random
-cache_buster = random.randint(1, 1000000)
+from functools import lru_cache
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-try:
-    from frontend.utils import predict_next_values
-except ImportError:
-    # fallback
-    def predict_next_values(df, value_column="value", time_column="timestamp", periods=24):
-        """Simple prediction function as fallback"""
-        if len(df) < 10 or df.empty:
-            return pd.DataFrame()
-        #simple lm
-        x = range(len(df))
-        y = df[value_column].values
- 
-        n = len(x)
-        x_mean = sum(x) / n
-        y_mean = sum(y) / n
-
-        numerator = sum((x[i] - x_mean) * (y[i] - y_mean) for i in range(n))
-        denominator = sum((x[i] - x_mean) ** 2 for i in range(n))
-        
-        slope = numerator / denominator if denominator != 0 else 0
-        intercept = y_mean - slope * x_mean
-
-        future_x = range(len(df), len(df) + periods)
-        future_y = [slope * i + intercept for i in future_x]
-
-        last_time = df[time_column].max()
-        if len(df) > 1:
-            avg_delta = (df[time_column].max() - df[time_column].min()) / (len(df) - 1)
-            future_times = [last_time + (i+1) * avg_delta for i in range(periods)]
-        else:
-            future_times = [last_time + pd.Timedelta(hours=i+1) for i in range(periods)]
-        
-        predictions = pd.DataFrame({
-            time_column: future_times,
-            value_column: future_y,
-            'predicted': True
-        })
-        
-        return predictions
+from frontend.utils import fetch_data, fetch_many, get_sensors, readings_to_dataframe, predict_next_values
 
 # Set page config
 st.set_page_config(
@@ -63,24 +21,29 @@ st.set_page_config(
 # Define API URL
 API_URL = "http://localhost:8000/api"
 
-# Fetch data from API
-def fetch_data(endpoint, params=None):
-    try:
-        response = requests.get(f"{API_URL}/{endpoint}", params=params)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        st.error(f"Error fetching data: {e}")
-        return []
+# Range selector and slider shared by the time series charts
+_XAXIS_LAYOUT = dict(
+    rangeselector=dict(
+        buttons=[
+            dict(count=1, label="1h", step="hour", stepmode="backward"),
+            dict(count=6, label="6h", step="hour", stepmode="backward"),
+            dict(count=1, label="1d", step="day", stepmode="backward"),
+            dict(count=7, label="1w", step="day", stepmode="backward"),
+            dict(step="all")
+        ]
+    ),
+    rangeslider=dict(visible=True),
+    type="date"
+)
 
-# Sensor readings to df
-def readings_to_dataframe(readings):
-    if not readings:
-        return pd.DataFrame()
-    
-    df = pd.DataFrame(readings)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    return df
+# Bumped by the refresh button to invalidate cached API responses
+if 'cache_buster' not in st.session_state:
+    st.session_state.cache_buster = 0
+
+# CSV export bytes, serialized once per sensor, time range and row count
+@st.cache_data(ttl=30, show_spinner=False)
+def _csv_bytes(sensor_id, start_time, end_time, count, _df):
+    return _df.to_csv(index=False).encode()
 
 
 if 'show_predictions' not in st.session_state:
@@ -93,6 +56,48 @@ This dashboard displays real-time data from IoT sensors.
 Monitor temperature, humidity, and other sensor readings with interactive charts.
 """)
 
+# Import plotly on first chart render instead of at startup, it is slow to load
+@lru_cache(maxsize=None)
+def _plotly():
+    import plotly.express as px
+    import plotly.graph_objects as go
+    return px, go
+
+# Plot a sensor's readings, with the predicted values as a dashed overlay if given
+def _render_series(df, sensor, predictions_df=None, unit=""):
+    sensor_type = sensor['sensor_type'].capitalize()
+    title = f"📈 {sensor_type} over Time"
+    if predictions_df is not None:
+        title += " (with Predictions)"
+    st.subheader(title)
+    
+    px, go = _plotly()
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(
+        x=df["timestamp"],
+        y=df["value"],
+        mode="lines",
+        name="Actual Data"
+    ))
+    if predictions_df is not None:
+        fig.add_trace(go.Scattergl(
+            x=predictions_df["timestamp"],
+            y=predictions_df["value"],
+            mode="lines",
+            line=dict(dash="dash", color="orange"),
+            name="Prediction"
+        ))
+    
+    fig.update_layout(
+        title=f"{sensor['name']} in {sensor['location']}",
+        xaxis_title="Time",
+        yaxis_title=f"{sensor_type} ({unit})",
+        showlegend=predictions_df is not None,
+        xaxis=_XAXIS_LAYOUT
+    )
+    
+    st.plotly_chart(fig, use_container_width=True)
+
 # Sidebar controls
 with st.sidebar:
     st.header("Dashboard Controls")
@@ -107,11 +112,19 @@ with st.sidebar:
         help="Enable to show predicted future values based on current data trend"
     )
     
+    if st.button("Refresh Data"):
+        st.session_state.cache_buster += 1
+        get_sensors.clear()
+    
     st.divider()
     
     # Get all sensors 
-    sensors = fetch_data("sensors")
-    sensor_options = {s["sensor_id"]: f"{s['name']} ({s['location']})" for s in sensors}
+    try:
+        sensors_by_id = get_sensors(API_URL)
+    except Exception as e:
+        st.error(f"Error fetching data from sensors: {e}")
+        sensors_by_id = {}
+    sensor_options = {sid: f"{s['name']} ({s['location']})" for sid, s in sensors_by_id.items()}
     
     # Sensor
     st.subheader("Sensor Selection")
@@ -146,30 +159,43 @@ with st.sidebar:
    # Updated timezone-aware version:
     from datetime import datetime, timedelta, timezone
 
-    # Use timezone-aware objects
-    end_time = datetime.now(timezone.utc)
+    # Use timezone-aware objects, rounded up to the minute so reruns
+    # within the same minute reuse the cached readings
+    end_time = datetime.now(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
     start_time = end_time - timedelta(hours=hours)
 
-# Main content area
+# Fetch alerts and the selected sensor's readings concurrently
+alert_params = {"hours": hours, "limit": 10}
 if selected_sensor_id:
-    # Fetch data
     params = {
         "start_time": start_time.isoformat(),
         "end_time": end_time.isoformat(),
         "limit": 1000
     }
-    readings = fetch_data(f"sensors/{selected_sensor_id}/readings", params)
+    alerts, readings = fetch_many(
+        API_URL,
+        ("alerts", alert_params),
+        (f"sensors/{selected_sensor_id}/readings", params),
+        cache_buster=st.session_state.cache_buster
+    )
+else:
+    alerts = fetch_data(API_URL, "alerts", alert_params, cache_buster=st.session_state.cache_buster)
+
+# Main content area
+if selected_sensor_id:
     df = readings_to_dataframe(readings)
     
     if df.empty:
         st.warning(f"No data available for the selected sensor and time range.")
     else:
         # Get sensor info for the sensor
-        selected_sensor = next((s for s in sensors if s["sensor_id"] == selected_sensor_id), None)
+        selected_sensor = sensors_by_id.get(selected_sensor_id)
         
         # Display current value in a big metric
-        current_value = df.iloc[0]["value"] if not df.empty else 0
-        current_unit = df.iloc[0]["unit"] if not df.empty and 'unit' in df.columns else ""
+        values = df['value'].to_numpy()
+        mean_value, min_value, max_value = values.mean(), values.min(), values.max()
+        current_value = values[0]
+        current_unit = df['unit'].iat[0] if 'unit' in df.columns else ""
         
         # Create columns for metrics
         col1, col2, col3 = st.columns(3)
@@ -178,19 +204,19 @@ if selected_sensor_id:
             st.metric(
                 label=f"Current {selected_sensor['sensor_type'].capitalize()}", 
                 value=f"{current_value} {current_unit}",
-                delta=f"{current_value - df.iloc[1]['value']:.2f}" if len(df) > 1 else None
+                delta=f"{values[0] - values[1]:.2f}" if len(values) > 1 else None
             )
         
         with col2:
             st.metric(
                 label="Average",
-                value=f"{df['value'].mean():.2f} {current_unit}"
+                value=f"{mean_value:.2f} {current_unit}"
             )
         
         with col3:
             st.metric(
                 label="Min/Max",
-                value=f"{df['value'].min():.2f} / {df['value'].max():.2f} {current_unit}"
+                value=f"{min_value:.2f} / {max_value:.2f} {current_unit}"
             )
         
         # Apply predictions 
@@ -198,117 +224,16 @@ if selected_sensor_id:
             predictions_df = predict_next_values(df)
             # Only add predictions if we have data
             if not predictions_df.empty:
-                # Create a combined dataframe with both actual and predicted data
-                combined_df = pd.concat([
-                    df.assign(predicted=False), 
-                    predictions_df
-                ]).reset_index(drop=True)
-                
-                # Create time series chart with predictions
-                st.subheader(f"📈 {selected_sensor['sensor_type'].capitalize()} over Time (with Predictions)")
-                
-                fig = go.Figure()
-                
-                # Add actual data
-                fig.add_trace(go.Scatter(
-                    x=df["timestamp"],
-                    y=df["value"],
-                    mode="lines",
-                    name="Actual Data"
-                ))
-                
-                # Add predicted data
-                fig.add_trace(go.Scatter(
-                    x=predictions_df["timestamp"],
-                    y=predictions_df["value"],
-                    mode="lines",
-                    line=dict(dash="dash", color="orange"),
-                    name="Prediction"
-                ))
-                
-                # Update layout
-                fig.update_layout(
-                    title=f"{selected_sensor['name']} in {selected_sensor['location']}",
-                    xaxis_title="Time",
-                    yaxis_title=f"{selected_sensor['sensor_type'].capitalize()} ({current_unit})",
-                    xaxis=dict(
-                        rangeselector=dict(
-                            buttons=list([
-                                dict(count=1, label="1h", step="hour", stepmode="backward"),
-                                dict(count=6, label="6h", step="hour", stepmode="backward"),
-                                dict(count=1, label="1d", step="day", stepmode="backward"),
-                                dict(count=7, label="1w", step="day", stepmode="backward"),
-                                dict(step="all")
-                            ])
-                        ),
-                        rangeslider=dict(visible=True),
-                        type="date"
-                    )
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
+                _render_series(df, selected_sensor, predictions_df, unit=current_unit)
             else:
                 st.warning("Not enough data for predictions. Need at least 10 data points.")
-                
-                # Regular chart without predictions
-                st.subheader(f"📈 {selected_sensor['sensor_type'].capitalize()} over Time")
-                fig = px.line(
-                    df, 
-                    x="timestamp", 
-                    y="value",
-                    title=f"{selected_sensor['name']} in {selected_sensor['location']}",
-                    labels={"timestamp": "Time", "value": f"{selected_sensor['sensor_type'].capitalize()} ({current_unit})"}
-                )
-                
-                fig.update_layout(
-                    xaxis=dict(
-                        rangeselector=dict(
-                            buttons=list([
-                                dict(count=1, label="1h", step="hour", stepmode="backward"),
-                                dict(count=6, label="6h", step="hour", stepmode="backward"),
-                                dict(count=1, label="1d", step="day", stepmode="backward"),
-                                dict(count=7, label="1w", step="day", stepmode="backward"),
-                                dict(step="all")
-                            ])
-                        ),
-                        rangeslider=dict(visible=True),
-                        type="date"
-                    )
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
+                _render_series(df, selected_sensor, unit=current_unit)
         else:
-            # Regular chart without predictions
-            st.subheader(f"📈 {selected_sensor['sensor_type'].capitalize()} over Time")
-            fig = px.line(
-                df, 
-                x="timestamp", 
-                y="value",
-                title=f"{selected_sensor['name']} in {selected_sensor['location']}",
-                labels={"timestamp": "Time", "value": f"{selected_sensor['sensor_type'].capitalize()} ({current_unit})"}
-            )
-            
-            fig.update_layout(
-                xaxis=dict(
-                    rangeselector=dict(
-                        buttons=list([
-                            dict(count=1, label="1h", step="hour", stepmode="backward"),
-                            dict(count=6, label="6h", step="hour", stepmode="backward"),
-                            dict(count=1, label="1d", step="day", stepmode="backward"),
-                            dict(count=7, label="1w", step="day", stepmode="backward"),
-                            dict(step="all")
-                        ])
-                    ),
-                    rangeslider=dict(visible=True),
-                    type="date"
-                )
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            _render_series(df, selected_sensor, unit=current_unit)
         
         # Export option
         if st.button("Export Data to CSV"):
-            csv = df.to_csv(index=False)
+            csv = _csv_bytes(selected_sensor_id, start_time, end_time, len(df), df)
             st.download_button(
                 label="Download CSV",
                 data=csv,
@@ -318,11 +243,10 @@ if selected_sensor_id:
 
 # Alerts section
 st.subheader("⚠️ Recent Alerts")
-alerts = fetch_data("alerts", {"hours": hours, "limit": 10})
 
 if alerts:
     alert_df = pd.DataFrame(alerts)
-    alert_df['timestamp'] = pd.to_datetime(alert_df['timestamp'])
+    alert_df['timestamp'] = pd.to_datetime(alert_df['timestamp'], format='ISO8601', utc=True, cache=True)
     
     # Display alerts in a table
     st.dataframe(
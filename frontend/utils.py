@@ -1,38 +1,134 @@
 """
 Utility functions for the IoT Sensor Dashboard
 """
+import streamlit as st
 import pandas as pd
 import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta
-import io
 import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson is optional, decode with the stdlib parser
+    _loads = json.loads
 
-def fetch_data(api_url, endpoint, params=None):
+@st.cache_resource
+def get_session():
     """
-    Fetch data from the API
+    Keep-alive session shared across reruns and users so API calls reuse their connection
+    
+    Returns:
+        requests.Session: Session with a pooled HTTP adapter
+    """
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_maxsize=8))
+    session.headers["Accept-Encoding"] = "gzip"
+    return session
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _get_json(api_url, endpoint, params, cache_buster):
+    response = get_session().get(f"{api_url}/{endpoint}", params=dict(params) if params else None, timeout=5)
+    response.raise_for_status()  # Raise exception for 4XX/5XX responses
+    return _loads(response.content)
+
+
+def _params_key(params):
+    # Params as a hashable cache key
+    return tuple(sorted(params.items())) if params else None
+
+
+def fetch_data(api_url, endpoint, params=None, cache_buster=0):
+    """
+    Fetch data from the API, cached for 30 seconds per endpoint and params
     
     Args:
         api_url (str): Base URL for the API
         endpoint (str): API endpoint to fetch
         params (dict): Parameters for the request
+        cache_buster (int): Change to bypass responses cached with an older value
         
     Returns:
         dict or list: The JSON response from the API
     """
     try:
-        response = requests.get(f"{api_url}/{endpoint}", params=params)
-        response.raise_for_status()  # Raise exception for 4XX/5XX responses
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching data from {endpoint}: {e}")
+        return _get_json(api_url, endpoint, _params_key(params), cache_buster)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        st.error(f"Error fetching data from {endpoint}: {e}")
         return []
 
 
+def fetch_many(api_url, *calls, cache_buster=0):
+    """
+    Fetch several endpoints concurrently
+    
+    Args:
+        api_url (str): Base URL for the API
+        *calls (tuple): (endpoint, params) pairs to fetch
+        cache_buster (int): Change to bypass responses cached with an older value
+        
+    Returns:
+        list: The JSON responses, in the same order as calls
+    """
+    # Streamlit calls stay on the script thread, only the requests run in the pool
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        futures = [
+            executor.submit(_get_json, api_url, endpoint, _params_key(params), cache_buster)
+            for endpoint, params in calls
+        ]
+    
+    results = []
+    for (endpoint, _), future in zip(calls, futures):
+        try:
+            results.append(future.result())
+        except (requests.exceptions.RequestException, ValueError) as e:
+            st.error(f"Error fetching data from {endpoint}: {e}")
+            results.append([])
+    return results
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_sensors(api_url):
+    """
+    Fetch sensor metadata, cached for 5 minutes since it rarely changes
+    
+    Args:
+        api_url (str): Base URL for the API
+        
+    Returns:
+        dict: Sensor dictionaries keyed by sensor_id
+    """
+    response = get_session().get(f"{api_url}/sensors", timeout=5)
+    response.raise_for_status()
+    return {s["sensor_id"]: s for s in _loads(response.content)}
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _readings_frame(sensor_id, count, first_timestamp, last_timestamp, _readings):
+    # Build each column directly instead of letting pandas infer from the dicts
+    sensor_ids = [r['sensor_id'] for r in _readings]
+    timestamps = [r['timestamp'] for r in _readings]
+    values = [r['value'] for r in _readings]
+    units = [r.get('unit', '') for r in _readings]
+    
+    return pd.DataFrame({
+        'sensor_id': sensor_ids,
+        'timestamp': pd.to_datetime(timestamps, format='ISO8601', utc=True, cache=True),
+        'value': np.asarray(values, dtype=np.float64),
+        'unit': units
+    })
+
+
 def readings_to_dataframe(readings):
     """
-    Convert a list of sensor readings to a Pandas DataFrame
+    Convert a list of sensor readings to a Pandas DataFrame, reusing the
+    parsed frame while the readings are unchanged
     
     Args:
         readings (list): List of sensor readings dictionaries
@@ -43,13 +139,13 @@ def readings_to_dataframe(readings):
     if not readings:
         return pd.DataFrame()
     
-    df = pd.DataFrame(readings)
-    
-    # Convert timestamp strings to datetime objects
-    if 'timestamp' in df.columns:
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-    
-    return df
+    return _readings_frame(
+        readings[0]["sensor_id"],
+        len(readings),
+        readings[0]["timestamp"],
+        readings[-1]["timestamp"],
+        readings
+    )
 
 
 def generate_summary_stats(df, value_column="value"):
@@ -83,6 +179,67 @@ def generate_summary_stats(df, value_column="value"):
     }
 
 
+def _rolling_anomalies(values, window, sigma):
+    """
+    Flag values outside mean +/- sigma * std of the trailing window, in one pass
+    
+    The window mean and sum of squared deviations are updated Welford-style as
+    values enter and leave, and rebuilt from the window every `window` steps
+    so rounding error cannot accumulate
+    
+    Args:
+        values (np.ndarray): Sensor values as float64, without NaNs
+        window (int): Size of the moving window
+        sigma (float): Number of standard deviations for threshold
+        
+    Returns:
+        np.ndarray: Boolean anomaly mask, False for the first window-1 values
+    """
+    n = values.size
+    out = np.zeros(n, np.bool_)
+    mean = 0.0
+    sq_dev = 0.0
+    for i in range(window - 1, n):
+        start = i - window + 1
+        if start % window == 0:
+            # Rebuild from the window itself
+            total = 0.0
+            for j in range(start, i + 1):
+                total += values[j]
+            mean = total / window
+            sq_dev = 0.0
+            for j in range(start, i + 1):
+                dev = values[j] - mean
+                sq_dev += dev * dev
+        else:
+            # Replace the value leaving the window with the new one
+            old = values[i - window]
+            new = values[i]
+            new_mean = mean + (new - old) / window
+            sq_dev += (new - old) * (new - new_mean + old - mean)
+            mean = new_mean
+            if sq_dev < 0.0:
+                sq_dev = 0.0
+        # Sample variance, like pandas' rolling std
+        std = math.sqrt(sq_dev / (window - 1))
+        # A flat window has no anomalies, whatever rounding is left in std
+        if std <= 1e-12 * abs(mean):
+            continue
+        diff = values[i] - mean
+        out[i] = diff > sigma * std or diff < -sigma * std
+    return out
+
+
+@lru_cache(maxsize=None)
+def _anomaly_kernel():
+    """Compile _rolling_anomalies with numba on first use, None if numba is not installed"""
+    try:
+        from numba import njit
+    except ImportError:  # numba is optional, detect_anomalies falls back to pandas
+        return None
+    return njit(cache=True)(_rolling_anomalies)
+
+
 def detect_anomalies(df, value_column="value", window=20, sigma=3):
     """
     Detect anomalies in sensor data using a moving average and standard deviation
@@ -99,11 +256,14 @@ def detect_anomalies(df, value_column="value", window=20, sigma=3):
     if len(df) < window or df.empty:
         # Not enough data for detection
         if not df.empty:
-            df['anomaly'] = False
+            return df.assign(anomaly=False)
         return df
     
-    # Create a copy of the dataframe
-    result = df.copy()
+    # Single compiled pass over the values when numba is available
+    values = df[value_column].to_numpy(dtype=np.float64)
+    kernel = _anomaly_kernel()
+    if kernel is not None and not np.isnan(values).any():
+        return df.assign(anomaly=kernel(values, window, float(sigma)))
     
     # Calculate rolling statistics
     rolling_mean = df[value_column].rolling(window=window).mean()
@@ -113,13 +273,11 @@ def detect_anomalies(df, value_column="value", window=20, sigma=3):
     upper_bound = rolling_mean + sigma * rolling_std
     lower_bound = rolling_mean - sigma * rolling_std
     
-    # Mark anomalies
-    result['anomaly'] = (df[value_column] > upper_bound) | (df[value_column] < lower_bound)
-    
-    # Fill NaN values (first window-1 rows) with False
-    result['anomaly'] = result['anomaly'].fillna(False)
+    # Mark anomalies, comparisons against the NaN bounds of the
+    # first window-1 rows are False
+    mask = (df[value_column] > upper_bound) | (df[value_column] < lower_bound)
     
-    return result
+    return df.assign(anomaly=mask)
 
 
 def export_to_csv(df, filename=None):
@@ -137,9 +295,7 @@ def export_to_csv(df, filename=None):
         return "", "empty_data.csv"
     
     # Generate CSV string
-    csv_buffer = io.StringIO()
-    df.to_csv(csv_buffer, index=False)
-    csv_string = csv_buffer.getvalue()
+    csv_string = df.to_csv(index=False)
     
     # Generate filename if not provided
     if filename is None:
@@ -149,33 +305,87 @@ def export_to_csv(df, filename=None):
     return csv_string, filename
 
 
-def predict_next_values_advanced(df, value_column="value", time_column="timestamp", periods=24):
+def predict_next_values(df, value_column="value", time_column="timestamp", periods=24):
     """
-    Advanced prediction of future values using more sophisticated algorithms
+    Predict future values by extending a least squares linear trend
+    
+    Args:
+        df (pd.DataFrame): DataFrame with sensor readings
+        value_column (str): Column containing the sensor values
+        time_column (str): Column containing the timestamps
+        periods (int): Number of future values to predict
+        
+    Returns:
+        pd.DataFrame: Predicted timestamps and values, flagged as predicted
     """
     if len(df) < 10 or df.empty:  # Need enough data for prediction
         return pd.DataFrame()
     
-    # Import additional libraries for better predictions
-    from statsmodels.tsa.arima.model import ARIMA
+    n = len(df)
+    x = np.arange(n, dtype=np.float64)
+    y = df[value_column].to_numpy(dtype=np.float64)
     
-    # Ensure the data is sorted by time
-    df = df.sort_values(by=time_column)
+    x_mean = x.mean()
+    y_mean = y.mean()
+    x_centered = x - x_mean
     
-    # Prepare data for ARIMA model
-    values = df[value_column].values
+    numerator = x_centered @ (y - y_mean)
+    denominator = x_centered @ x_centered
     
-    # Fit ARIMA model - adjust parameters as needed
-    model = ARIMA(values, order=(5,1,0))
-    model_fit = model.fit()
+    slope = numerator / denominator if denominator != 0 else 0
+    intercept = y_mean - slope * x_mean
+    
+    future_y = slope * np.arange(n, n + periods) + intercept
+    
+    # Generate future timestamps
+    last_time = df[time_column].max()
+    avg_delta = (last_time - df[time_column].min()) / (n - 1)
+    future_times = last_time + pd.to_timedelta(np.arange(1, periods + 1) * avg_delta.value, unit="ns")
+    
+    # Create a DataFrame with the predictions
+    predictions = pd.DataFrame({
+        time_column: future_times,
+        value_column: future_y,
+        'predicted': True
+    })
+    
+    return predictions
+
+
+# Forecasts are cached for a minute on the raw series bytes, so reruns on
+# unchanged readings skip refitting
+@st.cache_data(ttl=60, show_spinner=False)
+def _ar_forecast(values_bytes, periods):
+    # Import additional libraries for better predictions
+    from statsmodels.tsa.ar_model import AutoReg
+    
+    values = np.frombuffer(values_bytes, dtype=np.float64)
+    
+    # Fit AR(5) model, solved by least squares rather than an MLE optimizer
+    model_fit = AutoReg(values, lags=5, trend='c').fit()
     
     # Forecast future values
-    forecast = model_fit.forecast(steps=periods)
+    return model_fit.forecast(steps=periods)
+
+
+def predict_next_values_advanced(df, value_column="value", time_column="timestamp", periods=24):
+    """
+    Advanced prediction of future values using more sophisticated algorithms
+    """
+    if len(df) < 10 or df.empty:  # Need enough data for prediction
+        return pd.DataFrame()
+    
+    # Ensure the data is sorted by time
+    df = df.sort_values(by=time_column)
+    
+    # Prepare data for AR model
+    values = df[value_column].to_numpy(dtype=np.float64)
+    forecast = _ar_forecast(values.tobytes(), periods)
     
     # Generate future timestamps
     last_time = df[time_column].max()
-    time_delta = (df[time_column].max() - df[time_column].min()) / len(df)
-    future_times = [last_time + (i+1) * time_delta for i in range(periods)]
+    time_delta = (last_time - df[time_column].min()) / len(df)
+    future_times = last_time + pd.to_timedelta(np.arange(1, periods + 1) * time_delta.value, unit="ns")
     
     # Create a DataFrame with the predictions
     predictions = pd.DataFrame({
@@ -203,13 +413,24 @@ def process_alert_data(alerts):
     df = pd.DataFrame(alerts)
     
     if 'timestamp' in df.columns:
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601', utc=True, cache=True)
         
         now = pd.Timestamp.now(tz=df['timestamp'].dt.tz)
-        df['time_ago'] = (now - df['timestamp']).apply(format_timedelta)
+        seconds = (now - df['timestamp']).dt.total_seconds().to_numpy()
+        
+        # Same wording as format_timedelta, built for all rows at once
+        df['time_ago'] = np.select(
+            [seconds < 60, seconds < 3600, seconds < 86400],
+            [
+                np.char.add(seconds.astype(np.int64).astype(str), " seconds ago"),
+                np.char.add((seconds // 60).astype(np.int64).astype(str), " minutes ago"),
+                np.char.add((seconds // 3600).astype(np.int64).astype(str), " hours ago"),
+            ],
+            default=np.char.add((seconds // 86400).astype(np.int64).astype(str), " days ago")
+        )
     
     if 'sensor_id' in df.columns:
-        df['sensor'] = df['sensor_id'].apply(lambda x: x.replace('_', ' ').title())
+        df['sensor'] = df['sensor_id'].str.replace('_', ' ', regex=False).str.title()
     
     return df
 
@@ -236,6 +457,35 @@ def format_timedelta(td):
         return f"{int(seconds // 86400)} days ago"
 
 
+# Below this many sensors a plain loop is faster than building a DataFrame
+GROUPBY_MIN_SENSORS = 20
+
+
+def _group_sensor_ids(sensors, key):
+    """
+    Group sensor IDs by a sensor attribute, skipping sensors without an ID or value
+    
+    Args:
+        sensors (list): List of sensor dictionaries
+        key (str): Sensor attribute to group by
+        
+    Returns:
+        dict: Dictionary with attribute values as keys and lists of sensor IDs as values
+    """
+    if len(sensors) < GROUPBY_MIN_SENSORS:
+        groups = {}
+        for sensor in sensors:
+            group = sensor.get(key, '')
+            sensor_id = sensor.get('sensor_id', '')
+            if group and sensor_id:
+                groups.setdefault(group, []).append(sensor_id)
+        return groups
+    
+    df = pd.DataFrame(sensors, columns=[key, 'sensor_id'])
+    df = df[df[key].fillna('').astype(bool) & df['sensor_id'].fillna('').astype(bool)]
+    return df.groupby(key, sort=False)['sensor_id'].agg(list).to_dict()
+
+
 def group_sensors_by_type(sensors):
     """
     Group sensors by their type
@@ -249,19 +499,7 @@ def group_sensors_by_type(sensors):
     if not sensors:
         return {}
     
-    sensor_groups = {}
-    
-    for sensor in sensors:
-        sensor_type = sensor.get('sensor_type', '')
-        sensor_id = sensor.get('sensor_id', '')
-        
-        if sensor_type and sensor_id:
-            if sensor_type not in sensor_groups:
-                sensor_groups[sensor_type] = []
-            
-            sensor_groups[sensor_type].append(sensor_id)
-    
-    return sensor_groups
+    return _group_sensor_ids(sensors, 'sensor_type')
 
 
 def group_sensors_by_location(sensors):
@@ -277,16 +515,4 @@ def group_sensors_by_location(sensors):
     if not sensors:
         return {}
     
-    location_groups = {}
-    
-    for sensor in sensors:
-        location = sensor.get('location', '')
-        sensor_id = sensor.get('sensor_id', '')
-        
-        if location and sensor_id:
-            if location not in location_groups:
-                location_groups[location] = []
-            
-            location_groups[location].append(sensor_id)
-    
-    return location_groups
\ No newline at end of file
+    return _group_sensor_ids(sensors, 'location')